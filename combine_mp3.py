@@ -9,6 +9,8 @@ Usage:
     python combine_mp3.py <directory>
     python combine_mp3.py /path/to/audiobooks
     python combine_mp3.py "~/Downloads/Audio Files"
+    python combine_mp3.py --jobs 4 /path/to/audiobooks
+    python combine_mp3.py --quiet /path/to/audiobooks
 
 Example:
     "Der Aufstieg des Erddrachen - 01.mp3" + "Der Aufstieg des Erddrachen - 02.mp3" + ...
@@ -16,75 +18,463 @@ Example:
 """
 
 import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import logging
 import os
 import re
+import shutil
+import sqlite3
 import subprocess
 import sys
-import tempfile
+import threading
 import warnings
 
+log = logging.getLogger("mp3_combine")
+
+# Pattern to match MP3 files with numbers at end: "filename - 01.mp3", "filename - 02.mp3", etc.
+# or at beginning: "01 - filename.mp3", "02 - filename.mp3", "01. filename.mp3", etc.
+# A single match both classifies a file and yields its track number; the number at
+# the end takes precedence when both are present.
+_NUMBERED_MP3_RE = re.compile(
+    r"^(?:.+?\s*-\s*(?P<post>\d+)|(?P<pre>\d+)[\s.]*[-\s]+.+?)\.mp3$", re.IGNORECASE
+)
+
+# Linux and macOS expose inherited descriptors as /dev/fd/N, which ffmpeg can open
+# like a regular file
+_HAS_DEV_FD = os.name == "posix" and os.path.isdir("/dev/fd")
+
+# Single quotes in concat list entries are closed, escaped and reopened (kept as
+# constants since f-string expressions can't contain backslashes before 3.12)
+_QUOTE = "'"
+_ESCAPED_QUOTE = "'\\''"
+
+# Directories that never hold audiobooks and are not descended into, on top of
+# hidden (dot) directories
+_SKIP_DIRS = frozenset(
+    {"__pycache__", "node_modules", "System Volume Information", "$RECYCLE.BIN"}
+)
+
+# MPEG audio frame header lookup tables, keyed by the header's version bits
+_MPEG_VERSIONS = {0: "2.5", 2: "2", 3: "1"}
+_MPEG_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+
+def _scan_directory(directory):
+    """
+    List a directory once, splitting its entries into subdirectories and MP3 files.
+
+    Args:
+        directory (str): Directory path to scan
 
-def find_mp3_groups(directory):
+    Returns:
+        tuple: (subdirs, mp3_entries, names) where subdirs is a list of paths
+            (without hidden and well-known system directories),
+            mp3_entries a list of os.DirEntry objects and names a frozenset of the
+            names of all entries in the directory
     """
-    Find MP3 files in a directory and group them using directory name as base name.
+    subdirs = []
+    mp3_entries = []
+    names = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            names.append(entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith(".") and entry.name not in _SKIP_DIRS:
+                    subdirs.append(entry.path)
+            # Only lowercase the extension, not the whole name
+            elif entry.name[-4:].lower() == ".mp3" and entry.is_file():
+                mp3_entries.append(entry)
+    return subdirs, mp3_entries, frozenset(names)
+
+
+def open_cache(path):
+    """
+    Open (creating if needed) the persistent index of already processed directories.
 
     Args:
-        directory (str): Directory path to search
+        path (str): Path of the SQLite database file
+
+    Returns:
+        sqlite3.Connection: Connection to the index
+    """
+    # The walk runs in a worker thread (see _walk_in_thread) while the event loop
+    # marks directories done; process_tree serializes the two with a lock
+    cache = sqlite3.connect(path, check_same_thread=False)
+    cache.execute(
+        "CREATE TABLE IF NOT EXISTS dirs ("
+        "path BLOB PRIMARY KEY, mtime_ns INTEGER NOT NULL, "
+        "subdirs TEXT NOT NULL, done INTEGER NOT NULL)"
+    )
+    return cache
+
+
+def _cached_subdirs(cache, directory, mtime_ns):
+    """
+    Look up a directory that was fully processed and has not changed since.
+
+    Args:
+        cache (sqlite3.Connection): Index opened with open_cache
+        directory (str): Directory path
+        mtime_ns (int): Current modification time of the directory
+
+    Returns:
+        list: Subdirectory paths recorded for the directory, or None if it must be
+            scanned again
+    """
+    row = cache.execute(
+        "SELECT subdirs FROM dirs WHERE path = ? AND mtime_ns = ? AND done",
+        (os.fsencode(directory), mtime_ns),
+    ).fetchone()
+    if row is None:
+        return None
+    return [os.path.join(directory, name) for name in json.loads(row[0])]
+
+
+def _record_directory(cache, directory, mtime_ns, subdirs, done):
+    """
+    Store a scanned directory in the index.
+
+    Args:
+        cache (sqlite3.Connection): Index opened with open_cache
+        directory (str): Directory path
+        mtime_ns (int): Modification time of the directory when it was scanned
+        subdirs (list): Subdirectory paths found in the directory
+        done (bool): Whether the directory needs no further processing
+    """
+    cache.execute(
+        "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+        (
+            os.fsencode(directory),
+            mtime_ns,
+            json.dumps([os.path.basename(subdir) for subdir in subdirs]),
+            done,
+        ),
+    )
+
+
+def mark_done(cache, directory):
+    """
+    Mark a directory in the index as fully processed.
+
+    The modification time is refreshed, since writing outputs into the directory
+    changes it.
+
+    Args:
+        cache (sqlite3.Connection): Index opened with open_cache
+        directory (str): Directory path
+    """
+    try:
+        mtime_ns = os.stat(directory).st_mtime_ns
+    except OSError:
+        return
+    cache.execute(
+        "UPDATE dirs SET mtime_ns = ?, done = 1 WHERE path = ?",
+        (mtime_ns, os.fsencode(directory)),
+    )
+
+
+def iter_mp3_dirs(root, cache=None, stop=None, lock=None):
+    """
+    Recursively walk a directory tree with os.scandir, yielding directories that
+    contain MP3 files.
+
+    Each directory is enumerated exactly once; the cached DirEntry type information
+    is reused so no extra stat calls are needed. Symlinked, hidden and well-known
+    system directories (see _SKIP_DIRS) are not descended into.
+
+    With a cache, directories whose modification time matches a fully processed
+    entry are not listed again; their recorded subdirectories are walked instead.
+    Every scanned directory is recorded, and those yielded stay pending until they
+    are passed to mark_done.
+
+    Args:
+        root (str): Directory path to start from
+        cache (sqlite3.Connection, optional): Index opened with open_cache
+        stop (threading.Event, optional): Ends the walk before the next directory
+            once set
+        lock (threading.Lock, optional): Held around each use of the index, which
+            other threads may update at the same time
+
+    Yields:
+        tuple: (directory, mp3_entries, names) as returned by _scan_directory
+    """
+    if lock is None:
+        lock = contextlib.nullcontext()
+
+    pending = [root]
+    while pending:
+        if stop is not None and stop.is_set():
+            return
+        directory = pending.pop()
+        try:
+            if cache is not None:
+                mtime_ns = os.stat(directory).st_mtime_ns
+                with lock:
+                    subdirs = _cached_subdirs(cache, directory, mtime_ns)
+                if subdirs is not None:
+                    pending.extend(reversed(subdirs))
+                    continue
+            subdirs, mp3_entries, names = _scan_directory(directory)
+        except OSError as e:
+            log.error(f"Error reading directory '{directory}': {e}")
+            continue
+
+        if cache is not None:
+            with lock:
+                _record_directory(
+                    cache, directory, mtime_ns, subdirs, done=not mp3_entries
+                )
+
+        if mp3_entries:
+            yield directory, mp3_entries, names
+
+        # Visit subdirectories in the order they were listed
+        pending.extend(reversed(subdirs))
+
+
+def _group_from_names(directory, names):
+    """
+    Group the numbered MP3 file names of a directory using the directory name as
+    base name.
+
+    This is the pure matching logic of find_mp3_groups, without any filesystem
+    access.
+
+    Args:
+        directory (str): Directory path the names belong to
+        names (list): File names in the directory
 
     Returns:
-        dict: Dictionary where keys are base names and values are lists of file paths
+        dict: Dictionary where keys are base names and values are lists of file paths,
+            sorted by their number
     """
-    mp3_files = []
+    # A group needs at least two numbered files, so don't bother matching otherwise
+    if len(names) < 2:
+        return {}
+
+    numbered_files = []
 
-    # Pattern to match MP3 files with numbers at end: "filename - 01.mp3", "filename - 02.mp3", etc.
-    # or at beginning: "01 - filename.mp3", "02 - filename.mp3", "01. filename.mp3", etc.
-    pattern_end = re.compile(r"^.+?\s*-\s*(\d+)\.mp3$", re.IGNORECASE)
-    pattern_begin = re.compile(r"^(\d+)[\s\.]*[-\s]+.+?\.mp3$", re.IGNORECASE)
+    # Bound once, since this runs for every file in the directory
+    match_numbered = _NUMBERED_MP3_RE.match
+    append = numbered_files.append
 
-    for file in os.listdir(directory):
-        if file.lower().endswith(".mp3"):
-            # Check if file has a number (either at beginning or end)
-            if pattern_end.match(file) or pattern_begin.match(file):
-                full_path = os.path.join(directory, file)
-                mp3_files.append(full_path)
+    for name in names:
+        # Check if file has a number (either at beginning or end)
+        match = match_numbered(name)
+        if match is not None:
+            append((int(match["post"] or match["pre"]), name))
 
     # Use directory name as base name if we have multiple numbered files
-    if len(mp3_files) > 1:
+    if len(numbered_files) > 1:
         base_name = os.path.basename(directory)
-        return {base_name: mp3_files}
+        join = os.path.join
+        return {
+            base_name: [join(directory, name) for _, name in sorted(numbered_files)]
+        }
     else:
         return {}
 
 
-def sort_mp3_files(file_list):
+def find_mp3_groups(directory, entries=None):
     """
-    Sort MP3 files by their numeric suffix.
+    Find MP3 files in a directory and group them using directory name as base name.
 
     Args:
-        file_list (list): List of file paths
+        directory (str): Directory path to search
+        entries (list, optional): Pre-scanned os.DirEntry objects for the MP3 files
+            in the directory, e.g. from iter_mp3_dirs. Scanned if not given.
 
     Returns:
-        list: Sorted list of file paths
+        dict: Dictionary where keys are base names and values are lists of file paths,
+            sorted by their number
     """
+    if entries is None:
+        _, entries, _ = _scan_directory(directory)
 
-    def extract_number(file_path):
-        filename = os.path.basename(file_path)
-        # Try number at end first
-        match = re.search(r"-\s*(\d+)\.mp3$", filename, re.IGNORECASE)
-        if match:
-            return int(match.group(1))
-        # Try number at beginning (both dash and period formats)
-        match = re.search(r"^(\d+)[\s\.]*[-\s]", filename, re.IGNORECASE)
-        if match:
-            return int(match.group(1))
-        return 0
+    return _group_from_names(directory, [entry.name for entry in entries])
 
-    return sorted(file_list, key=extract_number)
 
+def _mp3_stream_params(file_path):
+    """
+    Read the stream parameters from the first MPEG audio frame header of an MP3 file.
 
-def concatenate_mp3s(file_list, output_path):
+    Only the frame directly following an ID3v2 tag (or at the start of the file) is
+    inspected, so this reads a few bytes per file instead of spawning ffprobe.
+
+    Args:
+        file_path (str): Path of the MP3 file
+
+    Returns:
+        tuple: (mpeg_version, layer, sample_rate, channels), or None if the file
+            could not be read or does not start with a recognizable frame header
     """
-    Concatenate MP3 files using ffmpeg.
+    try:
+        with open(file_path, "rb") as f:
+            header = f.read(10)
+            if len(header) == 10 and header[:3] == b"ID3":
+                # Skip the ID3v2 tag; its size is a 28-bit syncsafe integer
+                tag_size = (
+                    (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+                )
+                if header[5] & 0x10:  # Footer present
+                    tag_size += 10
+                f.seek(10 + tag_size)
+                header = f.read(4)
+    except OSError:
+        return None
+
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer == 0 or bitrate_index == 15 or sample_rate_index == 3:
+        return None
+
+    channels = 1 if header[3] >> 6 == 3 else 2
+    return (
+        _MPEG_VERSIONS[version],
+        4 - layer,
+        _MPEG_SAMPLE_RATES[version][sample_rate_index],
+        channels,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_bin():
+    """
+    Locate ffmpeg on PATH and check that it runs, once per process.
+
+    Returns:
+        str: Absolute path of the ffmpeg executable
+
+    Raises:
+        RuntimeError: If ffmpeg is not found on PATH
+        subprocess.CalledProcessError: If ffmpeg fails to run
+    """
+    path = shutil.which("ffmpeg")
+    if not path:
+        raise RuntimeError("ffmpeg is not installed or not in PATH")
+    subprocess.run(
+        [path, "-version"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    return path
+
+
+def _write_and_close(fd, data):
+    """
+    Write data to a pipe and close it, ignoring a reader that has gone away.
+
+    Args:
+        fd (int): Write end of the pipe
+        data (bytes): Data to write
+    """
+    try:
+        with open(fd, "wb") as pipe:
+            pipe.write(data)
+    except BrokenPipeError:
+        pass
+
+
+async def _run_concat(listing, output_args):
+    """
+    Run ffmpeg's concat demuxer on an in-memory file list.
+
+    Where inherited descriptors are reachable as /dev/fd/N the list is streamed
+    through a pipe passed with pass_fds, which ffmpeg opens as a plain file;
+    elsewhere it is fed through stdin via the pipe protocol.
+
+    Args:
+        listing (bytes): Concat demuxer file list
+        output_args (list): ffmpeg arguments following the input
+
+    Returns:
+        tuple: (returncode, stderr) with stderr as bytes
+    """
+    cmd = [
+        _ffmpeg_bin(),
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+    ]
+
+    if not _HAS_DEV_FD:
+        cmd += ["-protocol_whitelist", "pipe,file", "-i", "pipe:0", *output_args]
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        _, stderr = await process.communicate(listing)
+        return process.returncode, stderr
+
+    read_fd, write_fd = os.pipe()
+    cmd += ["-i", f"/dev/fd/{read_fd}", *output_args]
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            pass_fds=(read_fd,),
+        )
+    except BaseException:
+        os.close(write_fd)
+        raise
+    finally:
+        # Only ffmpeg may hold the read end, so writes fail if it exits early
+        os.close(read_fd)
+
+    # Write from a worker thread so a large list can't deadlock against stderr
+    loop = asyncio.get_running_loop()
+    _, (_, stderr) = await asyncio.gather(
+        loop.run_in_executor(None, _write_and_close, write_fd, listing),
+        process.communicate(),
+    )
+    return process.returncode, stderr
+
+
+def _format_mismatch(file_list):
+    """
+    Check whether MP3 files differ in format, which stream copy can't join.
+
+    Args:
+        file_list (list): List of MP3 file paths
+
+    Returns:
+        str: Description of the differing formats, or None if they agree
+    """
+    stream_params = {_mp3_stream_params(file_path) for file_path in file_list}
+    stream_params.discard(None)
+    if len(stream_params) < 2:
+        return None
+    return ", ".join(
+        f"MPEG-{version} layer {layer} {sample_rate} Hz {channels}ch"
+        for version, layer, sample_rate, channels in sorted(stream_params)
+    )
+
+
+async def _concatenate_mp3s(file_list, output_path):
+    """
+    Concatenate MP3 files using ffmpeg without blocking the event loop.
 
     Args:
         file_list (list): List of MP3 file paths to concatenate
@@ -94,86 +484,240 @@ def concatenate_mp3s(file_list, output_path):
         bool: True if successful, False otherwise
     """
     try:
-        # Create temporary file list for ffmpeg
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".txt", delete=False
-        ) as temp_file:
-            for file_path in file_list:
-                # Escape single quotes for ffmpeg
-                escaped_path = file_path.replace("'", "'\\''")
-                temp_file.write(f"file '{escaped_path}'\n")
-            temp_file_path = temp_file.name
-
-        # Run ffmpeg command
-        cmd = [
-            "ffmpeg",
-            "-f",
-            "concat",
-            "-safe",
-            "0",
-            "-i",
-            temp_file_path,
-            "-c",
-            "copy",
-            output_path,
-            "-y",  # Overwrite output file if it exists
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True)
-
-        # Clean up temp file
-        os.unlink(temp_file_path)
-
-        if result.returncode == 0:
+        # Stream copy can't join files with different formats, so refuse up front
+        # rather than after ffmpeg has read all the inputs
+        loop = asyncio.get_running_loop()
+        formats = await loop.run_in_executor(None, _format_mismatch, file_list)
+        if formats:
+            log.warning(
+                f"Input files for '{output_path}' have different formats "
+                f"({formats}), skipping"
+            )
+            return False
+
+        # Build the concat list for ffmpeg in memory; it never touches the disk
+        # Escape single quotes for ffmpeg; str.replace hands back the path itself
+        # when there is nothing to escape
+        listing = "".join(
+            [
+                f"file '{file_path.replace(_QUOTE, _ESCAPED_QUOTE)}'\n"
+                for file_path in file_list
+            ]
+        )
+
+        # Run ffmpeg command; only errors are logged, so the stderr pipe stays
+        # small and ffmpeg does no needless log formatting
+        returncode, stderr = await _run_concat(
+            os.fsencode(listing),
+            [
+                "-c",
+                "copy",
+                "-threads",
+                "1",  # Stream copy is single-threaded; leave cores to parallel jobs
+                "-y",  # Overwrite output file if it exists
+                output_path,
+            ],
+        )
+
+        if returncode == 0:
             return True
         else:
-            print(f"Error running ffmpeg: {result.stderr}")
+            stderr = stderr.decode(errors="replace")
+            log.error(f"Error running ffmpeg for '{output_path}': {stderr}")
             return False
 
     except Exception as e:
-        print(f"Error concatenating files: {e}")
+        log.error(f"Error concatenating files for '{output_path}': {e}")
         return False
 
 
-def process_directory(directory):
+def concatenate_mp3s(file_list, output_path):
+    """
+    Concatenate MP3 files using ffmpeg.
+
+    Args:
+        file_list (list): List of MP3 file paths to concatenate
+        output_path (str): Path for the output file
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    return asyncio.run(_concatenate_mp3s(file_list, output_path))
+
+
+async def _run_job(semaphore, task):
+    """
+    Run a single concatenation job once a slot is free.
+
+    Args:
+        semaphore (asyncio.Semaphore): Limits the number of concurrent ffmpeg runs
+        task (tuple): (directory, base_name, sorted_files, output_path)
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    _directory, _base_name, sorted_files, output_path = task
+    async with semaphore:
+        success = await _concatenate_mp3s(sorted_files, output_path)
+    if success:
+        log.info(f"  Successfully created '{output_path}'")
+    else:
+        log.error(f"  Failed to create '{output_path}'")
+    return success
+
+
+async def _run_directory(semaphore, directory, tasks, cache=None, lock=None):
     """
-    Process a single directory, concatenating MP3 groups found within.
+    Run the concatenation jobs of a directory, then mark it done in the index.
+
+    The index is committed right away, so an interrupted run keeps the progress
+    made so far.
+
+    Args:
+        semaphore (asyncio.Semaphore): Limits the number of concurrent ffmpeg runs
+        directory (str): Directory the jobs belong to
+        tasks (list): Jobs as returned by process_directory
+        cache (sqlite3.Connection, optional): Index opened with open_cache
+        lock (threading.Lock, optional): Held while updating the index
+    """
+    results = await asyncio.gather(*[_run_job(semaphore, task) for task in tasks])
+
+    # Directories with failures stay pending so they are retried next run
+    if cache is not None and all(results):
+        with lock:
+            mark_done(cache, directory)
+            cache.commit()
+
+
+async def _walk_in_thread(root, cache=None, lock=None):
+    """
+    Run iter_mp3_dirs in a worker thread, handing its results to the event loop.
+
+    The walk's blocking scandir, stat and index calls then no longer hold up the
+    event loop, so ffmpeg runs start while later directories are being scanned.
+    If the caller stops iterating early (on an error or cancellation), the thread
+    ends after its current directory instead of walking the rest of the tree,
+    which asyncio.run would otherwise wait for on shutdown.
+
+    Args:
+        root (str): Directory path to start from
+        cache (sqlite3.Connection, optional): Index opened with open_cache
+        lock (threading.Lock, optional): Held around each use of the index
+
+    Yields:
+        tuple: (directory, mp3_entries, names) as returned by _scan_directory
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def walk():
+        try:
+            for item in iter_mp3_dirs(root, cache, stop, lock):
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    walker = loop.run_in_executor(None, walk)
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+
+    # Re-raise anything that went wrong in the walk
+    await walker
+
+
+async def process_tree(target_dir, jobs, cache=None):
+    """
+    Walk a directory tree and concatenate the MP3 groups found in it.
+
+    The walk runs in a worker thread and ffmpeg runs are started as soon as their
+    directory has been scanned, so it overlaps with up to `jobs` concurrent
+    concatenations.
+
+    Args:
+        target_dir (str): Directory to walk; MP3 files directly inside it are ignored
+        jobs (int): Maximum number of concurrent ffmpeg processes
+        cache (sqlite3.Connection, optional): Index opened with open_cache; each
+            processed directory is marked done in it as soon as its jobs have
+            finished, unless one of them failed
+    """
+    semaphore = asyncio.Semaphore(jobs)
+    # The walk thread and the event loop share the index connection
+    lock = threading.Lock()
+    running = []
+
+    # Walk through all subdirectories containing MP3 files
+    async for root, mp3_entries, names in _walk_in_thread(target_dir, cache, lock):
+        # Skip the target directory itself; it stays pending in the index, so a
+        # later run on a parent directory still processes it
+        if root == target_dir:
+            continue
+
+        tasks = process_directory(root, mp3_entries, names)
+        running.append(
+            asyncio.create_task(_run_directory(semaphore, root, tasks, cache, lock))
+        )
+
+    await asyncio.gather(*running)
+
+    # Keep the directories the walk recorded as needing no processing
+    if cache is not None:
+        with lock:
+            cache.commit()
+
+
+def process_directory(directory, entries=None, existing_names=None):
+    """
+    Process a single directory, collecting jobs for the MP3 groups found within.
 
     Args:
         directory (str): Directory path to process
+        entries (list, optional): Pre-scanned os.DirEntry objects for the MP3 files
+            in the directory. Scanned if not given.
+        existing_names (frozenset, optional): Names of all entries in the directory,
+            from the same scan as entries. Used to skip outputs that already exist.
+
+    Returns:
+        list: Jobs as (directory, base_name, sorted_files, output_path) tuples
     """
-    print(f"Processing directory: {directory}")
+    log.info(f"Processing directory: {directory}")
 
-    mp3_groups = find_mp3_groups(directory)
+    if entries is None:
+        _, entries, existing_names = _scan_directory(directory)
+    elif existing_names is None:
+        existing_names = frozenset(entry.name for entry in entries)
 
-    if not mp3_groups:
-        print(f"  No MP3 groups found in {directory}")
-        return
+    mp3_groups = find_mp3_groups(directory, entries)
 
-    for base_name, file_list in mp3_groups.items():
-        print(f"  Found {len(file_list)} files for '{base_name}'")
+    if not mp3_groups:
+        log.info(f"  No MP3 groups found in {directory}")
+        return []
 
-        # Sort files by number
-        sorted_files = sort_mp3_files(file_list)
+    tasks = []
+    for base_name, sorted_files in mp3_groups.items():
+        log.info(f"  Found {len(sorted_files)} files for '{base_name}'")
 
         # Create output filename
         output_filename = f"{base_name}.mp3"
         output_path = os.path.join(directory, output_filename)
 
-        # Skip if output file already exists
-        if os.path.exists(output_path):
-            print(f"    Output file '{output_filename}' already exists, skipping...")
+        # Skip if output file already exists; checked against the directory
+        # listing rather than with a stat per output
+        if output_filename in existing_names:
+            log.info(f"    Output file '{output_filename}' already exists, skipping...")
             continue
 
-        print(
-            f"    Concatenating {len(sorted_files)} files into '{output_filename}'..."
-        )
+        log.info(f"    Queued {len(sorted_files)} files for '{output_filename}'")
+        tasks.append((directory, base_name, sorted_files, output_path))
 
-        # Concatenate files
-        if concatenate_mp3s(sorted_files, output_path):
-            print(f"    Successfully created '{output_filename}'")
-        else:
-            print(f"    Failed to create '{output_filename}'")
+    return tasks
 
 
 def main():
@@ -189,6 +733,9 @@ Examples:
   %(prog)s /path/to/audiobooks
   %(prog)s "~/Downloads/Audio Files"
   %(prog)s .  # Process current directory
+  %(prog)s -j 4 /path/to/audiobooks  # Run at most 4 ffmpeg processes at once
+  %(prog)s --cache ~/.mp3_combine.db /path/to/audiobooks  # Skip unchanged dirs
+  %(prog)s -q /path/to/audiobooks  # Only report warnings and errors
 
 The script will recursively traverse all subdirectories and concatenate
 MP3 files with the same base name (ignoring numbers) into single files.
@@ -199,11 +746,39 @@ MP3 files with the same base name (ignoring numbers) into single files.
         "directory", nargs="?", help="Target directory to process (required)"
     )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of concatenations to run in parallel (default: CPU count)",
+    )
+
+    parser.add_argument(
+        "--cache",
+        metavar="FILE",
+        help="SQLite index of processed directories; unchanged ones are skipped "
+        "on later runs",
+    )
+
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="Only report warnings and errors",
+    )
+
     parser.add_argument("--version", action="version", version="%(prog)s 1.0")
 
     # Parse arguments
     args = parser.parse_args()
 
+    logging.basicConfig(
+        level=logging.WARNING if args.quiet else logging.INFO,
+        format="%(message)s",
+        stream=sys.stdout,
+    )
+
     # Check if directory argument is provided
     if not args.directory:
         warnings.warn(
@@ -211,43 +786,51 @@ MP3 files with the same base name (ignoring numbers) into single files.
             UserWarning,
             stacklevel=2,
         )
-        print("Usage: python combine_mp3.py <directory>")
-        print("Example: python combine_mp3.py /path/to/audiobooks")
-        print("Use --help for more information.")
+        log.error("Usage: python combine_mp3.py <directory>")
+        log.error("Example: python combine_mp3.py /path/to/audiobooks")
+        log.error("Use --help for more information.")
         sys.exit(1)
 
     # Validate and resolve directory path
     target_dir = os.path.abspath(os.path.expanduser(args.directory))
 
     if not os.path.exists(target_dir):
-        print(f"Error: Directory '{target_dir}' does not exist.")
+        log.error(f"Error: Directory '{target_dir}' does not exist.")
         sys.exit(1)
 
     if not os.path.isdir(target_dir):
-        print(f"Error: '{target_dir}' is not a directory.")
+        log.error(f"Error: '{target_dir}' is not a directory.")
         sys.exit(1)
 
     # Check if ffmpeg is available
     try:
-        subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("Error: ffmpeg is not installed or not in PATH")
-        print("Please install ffmpeg to use this script")
+        _ffmpeg_bin()
+    except (RuntimeError, subprocess.CalledProcessError, OSError):
+        log.error("Error: ffmpeg is not installed or not in PATH")
+        log.error("Please install ffmpeg to use this script")
         sys.exit(1)
 
-    print(f"Starting MP3 concatenation from: {target_dir}")
+    if args.jobs < 1:
+        log.error("Error: --jobs must be at least 1")
+        sys.exit(1)
 
-    # Walk through all subdirectories
-    for root, dirs, files in os.walk(target_dir):
-        # Skip the target directory itself
-        if root == target_dir:
-            continue
+    cache = None
+    if args.cache:
+        try:
+            cache = open_cache(os.path.expanduser(args.cache))
+        except sqlite3.Error as e:
+            log.error(f"Error: Cannot open cache '{args.cache}': {e}")
+            sys.exit(1)
 
-        # Only process directories that contain MP3 files
-        if any(file.lower().endswith(".mp3") for file in files):
-            process_directory(root)
+    log.info(f"Starting MP3 concatenation from: {target_dir}")
+
+    try:
+        asyncio.run(process_tree(target_dir, args.jobs, cache))
+    finally:
+        if cache is not None:
+            cache.close()
 
-    print("MP3 concatenation complete!")
+    log.info("MP3 concatenation complete!")
 
 
 if __name__ == "__main__":
@@ -1,213 +1,377 @@
 #!/usr/bin/env python3
 """
-Unit tests for the combine_mp3.py script, specifically testing the
-find_mp3_groups function.
+Unit tests for the combine_mp3.py script: grouping numbered MP3 files, walking
+directory trees with the persistent index, and reading MP3 frame headers.
 """
 
+import asyncio
 import os
+import shutil
+import sys
 import tempfile
+import threading
 import unittest
-from pathlib import Path
-from combine_mp3 import find_mp3_groups
+from unittest import mock
+
+import combine_mp3
+from combine_mp3 import (
+    _format_mismatch,
+    _group_from_names,
+    _mp3_stream_params,
+    concatenate_mp3s,
+    find_mp3_groups,
+    iter_mp3_dirs,
+    mark_done,
+    open_cache,
+    process_directory,
+    process_tree,
+)
+
+# Keep test files on a RAM-backed filesystem where one is available, since /tmp
+# may be disk-backed; None falls back to tempfile's default location
+TMPFS_DIR = (
+    "/dev/shm"
+    if sys.platform.startswith("linux") and os.access("/dev/shm", os.W_OK | os.X_OK)
+    else None
+)
+
+# Creating, listing and removing files relative to a directory descriptor is
+# only available on Unix; elsewhere the test helpers fall back to full paths
+HAS_DIR_FD = (
+    os.open in os.supports_dir_fd
+    and os.unlink in os.supports_dir_fd
+    and os.scandir in os.supports_fd
+)
+
+# MPEG-1 layer III frame headers at 128 kbit/s: joint stereo at 44.1 kHz, the
+# same in mono, and joint stereo at 48 kHz
+STEREO_44K = b"\xff\xfb\x90\x64"
+MONO_44K = b"\xff\xfb\x90\xc4"
+STEREO_48K = b"\xff\xfb\x94\x64"
+
+
+def id3_tag(size, footer=False):
+    """Build an ID3v2.4 tag header announcing a tag body of the given size."""
+    syncsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x04\x00" + (b"\x10" if footer else b"\x00") + syncsafe
+
+
+# Stand-in for ffmpeg's concat demuxer with stream copy: reads the file list
+# from the -i argument, unquoting paths as strictly as ffmpeg does, and writes
+# the listed files back to back to the output
+FFMPEG_STUB = r"""
+import os
+import sys
+
+
+def unquote(text):
+    path = []
+    quoted = False
+    chars = iter(text)
+    for char in chars:
+        if char == "'":
+            quoted = not quoted
+        elif char == "\\" and not quoted:
+            path.append(next(chars))
+        elif char.isspace() and not quoted:
+            sys.exit(f"Invalid file list entry: {text}")
+        else:
+            path.append(char)
+    if quoted:
+        sys.exit(f"Unterminated quote in file list entry: {text}")
+    return "".join(path)
+
+
+args = sys.argv[1:]
+listing = args[args.index("-i") + 1]
+if listing == "pipe:0":
+    # Reading files named in a piped list needs both protocols allowed
+    whitelist = args[args.index("-protocol_whitelist") + 1].split(",")
+    if not {"pipe", "file"} <= set(whitelist):
+        sys.exit(f"Protocols not allowed: {whitelist}")
+    data = sys.stdin.buffer.read()
+else:
+    with open(listing, "rb") as f:
+        data = f.read()
+
+with open(args[-1], "wb") as output:
+    for line in os.fsdecode(data).splitlines():
+        path = unquote(line.removeprefix("file "))
+        try:
+            with open(path, "rb") as f:
+                output.write(f.read())
+        except OSError as e:
+            sys.exit(f"Error opening input: {e}")
+"""
 
 
-class TestFindMp3Groups(unittest.TestCase):
-    """Test cases for the find_mp3_groups function."""
+def touch(path, dir_fd=None):
+    """
+    Create an empty file, failing if it already exists.
+
+    Unlike Path.touch() this skips the utime call, which the tests don't need.
+    With dir_fd, path is relative to that directory descriptor.
+    """
+    fd = os.open(
+        path,
+        os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_CLOEXEC", 0),
+        0o644,
+        dir_fd=dir_fd,
+    )
+    os.close(fd)
+
+
+def assert_grouping_cases(test_case, cases, groups_for):
+    """
+    Check grouping against a table of cases, each as a subtest.
+
+    Args:
+        test_case (unittest.TestCase): Test case to run the subtests on
+        cases: (name, filenames, expected_count) tuples, where expected_count
+            is the size of the single expected group, or 0 for no group
+        groups_for: Callable taking a case's name and filenames and returning
+            the groups found, keyed by the name
+    """
+    for name, filenames, expected_count in cases:
+        with test_case.subTest(case=name):
+            groups = groups_for(name, filenames)
+
+            if expected_count:
+                # All numbered files grouped under the directory name
+                test_case.assertEqual(list(groups), [name])
+                test_case.assertEqual(len(groups[name]), expected_count)
+            else:
+                test_case.assertEqual(groups, {})
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    Base class giving each test its own empty directory inside one temporary
+    directory shared by the whole class.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Create the temporary directory shared by all tests of the class."""
+        cls._root = tempfile.mkdtemp(dir=TMPFS_DIR)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the shared temporary directory, emptied after each test."""
+        os.rmdir(cls._root)
 
     def setUp(self):
-        """Set up a temporary directory for testing."""
-        self.test_dir = tempfile.mkdtemp()
+        """Set up a directory for this test, named after the test method."""
+        # Expected group name, since groups are named after their directory
+        self.dir_name = self._testMethodName
+        self._dir_fds = {}
+        self.test_dir = self.make_test_dir(self.dir_name)
 
-    def tearDown(self):
-        """Clean up temporary directory after tests."""
-        import shutil
-        shutil.rmtree(self.test_dir)
-
-    def create_test_files(self, filenames):
-        """Create empty test files in the test directory."""
-        for filename in filenames:
-            file_path = os.path.join(self.test_dir, filename)
-            Path(file_path).touch()
-
-    def test_basic_grouping(self):
-        """
-        Test basic grouping of MP3 files using directory name as base name.
+    def make_test_dir(self, name):
         """
-        test_files = [
-            "Der Aufstieg des Erddrachen - 01.mp3",
-            "Der Aufstieg des Erddrachen - 02.mp3",
-            "Der Aufstieg des Erddrachen - 03.mp3"
-        ]
-        self.create_test_files(test_files)
-
-        groups = find_mp3_groups(self.test_dir)
-
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 3)
+        Create an empty directory in the shared one, removed again after the test.
 
-    def test_multiple_groups(self):
+        Returns:
+            str: Path of the new directory
         """
-        Test that all numbered MP3 files in a directory are grouped together.
+        path = os.path.join(self._root, name)
+        os.mkdir(path)
+        dir_fd = None
+        if HAS_DIR_FD:
+            # Files are created relative to this descriptor, avoiding a full path
+            # lookup per file
+            dir_fd = os.open(path, os.O_DIRECTORY | os.O_CLOEXEC)
+            self._dir_fds[path] = dir_fd
+        self.addCleanup(self._remove_test_dir, path, dir_fd)
+        return path
+
+    @staticmethod
+    def _remove_test_dir(path, dir_fd=None):
+        """Remove a directory created by make_test_dir and close its descriptor."""
+        # The directory only ever holds regular files, so a flat scandir loop
+        # does without shutil.rmtree's per-entry stat and recursion
+        if dir_fd is None:
+            with os.scandir(path) as it:
+                for entry in it:
+                    os.unlink(entry.path)
+        else:
+            # Unlinking relative to the descriptor avoids a full path lookup
+            with os.scandir(dir_fd) as it:
+                for entry in it:
+                    os.unlink(entry.name, dir_fd=dir_fd)
+            os.close(dir_fd)
+        os.rmdir(path)
+
+    def create_test_files(self, filenames, directory=None):
         """
-        test_files = [
-            "Story A - 01.mp3",
-            "Story A - 02.mp3",
-            "Story B - 01.mp3",
-            "Story B - 02.mp3",
-            "Story B - 03.mp3"
-        ]
-        self.create_test_files(test_files)
-
-        groups = find_mp3_groups(self.test_dir)
-
-        # All files grouped under directory name
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        # All 5 files together
-        self.assertEqual(len(groups[directory_name]), 5)
-
-    def test_single_file_excluded(self):
-        """Test that directories with only one numbered file are excluded."""
-        test_files = [
-            "Single File - 01.mp3"  # Only one file, should be excluded
-        ]
-        self.create_test_files(test_files)
-
-        groups = find_mp3_groups(self.test_dir)
-
-        self.assertEqual(len(groups), 0)  # No groups since only one file
-
-    def test_different_number_formats(self):
-        """
-        Test different number formats (with/without leading zeros, spaces).
+        Create empty test files from an iterable of names, in the test directory
+        unless another directory from make_test_dir is given.
         """
-        test_files = [
-            "Test Story - 1.mp3",
-            "Test Story - 2.mp3",
-            "Test Story - 10.mp3",
-            "Padded Story - 01.mp3",
-            "Padded Story - 02.mp3",
-            "Spaced Story -1.mp3",
-            "Spaced Story -2.mp3"
-        ]
-        self.create_test_files(test_files)
-
-        groups = find_mp3_groups(self.test_dir)
-
-        # All files grouped under directory name
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        # All 7 files together
-        self.assertEqual(len(groups[directory_name]), 7)
-
-    def test_case_insensitive_extension(self):
-        """Test that .MP3 and .mp3 extensions are both recognized."""
-        test_files = [
-            "Mixed Case - 01.mp3",
-            "Mixed Case - 02.MP3",
-            "Mixed Case - 03.Mp3"
-        ]
-        self.create_test_files(test_files)
-
-        groups = find_mp3_groups(self.test_dir)
-
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 3)
-
-    def test_non_mp3_files_ignored(self):
-        """Test that non-MP3 files are ignored."""
-        test_files = [
-            "Audio Story - 01.mp3",
-            "Audio Story - 02.mp3",
-            "Audio Story - 01.wav",
-            "Audio Story - 02.txt",
-            "readme.txt"
-        ]
-        self.create_test_files(test_files)
-
-        groups = find_mp3_groups(self.test_dir)
-
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        # Only the 2 MP3 files
-        self.assertEqual(len(groups[directory_name]), 2)
-
-    def test_files_without_numbers_ignored(self):
-        """Test that MP3 files without numbers are ignored."""
-        test_files = [
-            "Numbered Story - 01.mp3",
-            "Numbered Story - 02.mp3",
-            "No Numbers Story.mp3",
-            "Also No Numbers.mp3"
-        ]
-        self.create_test_files(test_files)
-
-        groups = find_mp3_groups(self.test_dir)
-
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        # Only the 2 numbered files
-        self.assertEqual(len(groups[directory_name]), 2)
-
-    def test_empty_directory(self):
-        """Test behavior with empty directory."""
-        groups = find_mp3_groups(self.test_dir)
-
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
-
-    def test_long_base_names(self):
-        """Test with very long base names."""
-        test_files = [
-            ("This is a Very Long Story Title with Many Words"
-                " and Characters - 01.mp3"),
-            ("This is a Very Long Story Title with Many Words"
-                " and Characters - 02.mp3")
-        ]
-        self.create_test_files(test_files)
+        if directory is None:
+            directory = self.test_dir
+        dir_fd = self._dir_fds.get(directory)
+        for filename in filenames:
+            if dir_fd is None:
+                touch(os.path.join(directory, filename))
+            else:
+                touch(filename, dir_fd)
 
-        groups = find_mp3_groups(self.test_dir)
+    def write_file(self, filename, data):
+        """Write a test file with the given content, returning its path."""
+        path = os.path.join(self.test_dir, filename)
+        with open(path, "xb") as f:
+            f.write(data)
+        return path
 
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 2)
-
-    def test_special_characters_in_names(self):
-        """Test with special characters in base names."""
-        test_files = [
-            "Story with (Parentheses) & Symbols! - 01.mp3",
-            "Story with (Parentheses) & Symbols! - 02.mp3"
-        ]
-        self.create_test_files(test_files)
 
-        groups = find_mp3_groups(self.test_dir)
+class TestFindMp3Groups(TempDirTestCase):
+    """Test cases for the find_mp3_groups function."""
 
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 2)
+    CASES = (
+        (
+            "basic_grouping",
+            (
+                "Der Aufstieg des Erddrachen - 01.mp3",
+                "Der Aufstieg des Erddrachen - 02.mp3",
+                "Der Aufstieg des Erddrachen - 03.mp3",
+            ),
+            3,
+        ),
+        (
+            # All numbered files in a directory are grouped together
+            "multiple_groups",
+            (
+                "Story A - 01.mp3",
+                "Story A - 02.mp3",
+                "Story B - 01.mp3",
+                "Story B - 02.mp3",
+                "Story B - 03.mp3",
+            ),
+            5,
+        ),
+        (
+            "single_file_excluded",
+            ("Single File - 01.mp3",),  # Only one file, should be excluded
+            0,
+        ),
+        (
+            # With/without leading zeros, spaces
+            "different_number_formats",
+            (
+                "Test Story - 1.mp3",
+                "Test Story - 2.mp3",
+                "Test Story - 10.mp3",
+                "Padded Story - 01.mp3",
+                "Padded Story - 02.mp3",
+                "Spaced Story -1.mp3",
+                "Spaced Story -2.mp3",
+            ),
+            7,
+        ),
+        (
+            "case_insensitive_extension",
+            (
+                "Mixed Case - 01.mp3",
+                "Mixed Case - 02.MP3",
+                "Mixed Case - 03.Mp3",
+            ),
+            3,
+        ),
+        (
+            # Only non-MP3 files, even if numbered
+            "no_mp3_files",
+            (
+                "Audio Story - 01.wav",
+                "Audio Story - 02.wav",
+                "document.txt",
+            ),
+            0,
+        ),
+        (
+            # Only the 2 MP3 files
+            "non_mp3_files_ignored",
+            (
+                "Audio Story - 01.mp3",
+                "Audio Story - 02.mp3",
+                "Audio Story - 01.wav",
+                "Audio Story - 02.txt",
+                "readme.txt",
+            ),
+            2,
+        ),
+        (
+            # Only the 2 numbered files
+            "files_without_numbers_ignored",
+            (
+                "Numbered Story - 01.mp3",
+                "Numbered Story - 02.mp3",
+                "No Numbers Story.mp3",
+                "Also No Numbers.mp3",
+            ),
+            2,
+        ),
+        ("empty_directory", (), 0),
+        (
+            "long_base_names",
+            (
+                "This is a Very Long Story Title with Many Words"
+                " and Characters - 01.mp3",
+                "This is a Very Long Story Title with Many Words"
+                " and Characters - 02.mp3",
+            ),
+            2,
+        ),
+        (
+            "special_characters_in_names",
+            (
+                "Story with (Parentheses) & Symbols! - 01.mp3",
+                "Story with (Parentheses) & Symbols! - 02.mp3",
+            ),
+            2,
+        ),
+        (
+            "numbers_at_beginning_of_filename",
+            (
+                "01 - Chapter One.mp3",
+                "02 - Chapter Two.mp3",
+                "03 - Chapter Three.mp3",
+            ),
+            3,
+        ),
+        (
+            "mixed_number_positions",
+            (
+                "01 - Chapter One.mp3",
+                "Story - 02.mp3",
+                "03 - Chapter Three.mp3",
+                "Story - 04.mp3",
+            ),
+            4,
+        ),
+    )
+
+    def test_grouping_cases(self):
+        """Test grouping for each case in CASES, each in its own directory."""
+
+        def groups_for(name, filenames):
+            directory = self.make_test_dir(name)
+            self.create_test_files(filenames, directory)
+            return find_mp3_groups(directory)
+
+        assert_grouping_cases(self, self.CASES, groups_for)
 
     def test_full_file_paths_returned(self):
         """Test that full file paths are returned, not just filenames."""
-        test_files = [
+        test_files = (
             "Path Test - 01.mp3",
             "Path Test - 02.mp3"
-        ]
+        )
         self.create_test_files(test_files)
 
         groups = find_mp3_groups(self.test_dir)
 
         self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
+        directory_name = self.dir_name
         file_paths = groups[directory_name]
 
         for file_path in file_paths:
@@ -215,58 +379,22 @@ class TestFindMp3Groups(unittest.TestCase):
             self.assertTrue(file_path.startswith(self.test_dir))
             self.assertTrue(os.path.exists(file_path))
 
-    def test_numbers_at_beginning_of_filename(self):
-        """Test files with numbers at the beginning of the filename."""
-        test_files = [
-            "01 - Chapter One.mp3",
-            "02 - Chapter Two.mp3",
-            "03 - Chapter Three.mp3"
-        ]
-        self.create_test_files(test_files)
-
-        groups = find_mp3_groups(self.test_dir)
-
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 3)
-
-    def test_mixed_number_positions(self):
-        """Test files with numbers at both beginning and end positions."""
-        test_files = [
-            "01 - Chapter One.mp3",
-            "Story - 02.mp3",
-            "03 - Chapter Three.mp3",
-            "Story - 04.mp3"
-        ]
-        self.create_test_files(test_files)
-
-        groups = find_mp3_groups(self.test_dir)
-
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 4)
-
     def test_sorting_with_numbers_at_beginning(self):
         """Test that files with numbers at beginning are sorted correctly."""
-        test_files = [
+        test_files = (
             "03 - Chapter Three.mp3",
             "01 - Chapter One.mp3",
             "02 - Chapter Two.mp3",
             "10 - Chapter Ten.mp3"
-        ]
+        )
         self.create_test_files(test_files)
 
         groups = find_mp3_groups(self.test_dir)
-        directory_name = os.path.basename(self.test_dir)
-
-        # Import the sorting function to test it directly
-        from combine_mp3 import sort_mp3_files
-        sorted_files = sort_mp3_files(groups[directory_name])
+        directory_name = self.dir_name
 
+        # Groups come back already sorted by number
         # Extract just the filenames for easier assertion
-        filenames = [os.path.basename(f) for f in sorted_files]
+        filenames = [os.path.basename(f) for f in groups[directory_name]]
         expected_order = [
             "01 - Chapter One.mp3",
             "02 - Chapter Two.mp3",
@@ -276,241 +404,492 @@ class TestFindMp3Groups(unittest.TestCase):
 
         self.assertEqual(filenames, expected_order)
 
+    def test_sorting_with_numbers_at_end(self):
+        """Test that files with numbers at end are sorted numerically."""
+        test_files = (
+            "Story - 10.mp3",
+            "Story - 2.mp3",
+            "Story - 1.mp3"
+        )
+        self.create_test_files(test_files)
+
+        groups = find_mp3_groups(self.test_dir)
+        directory_name = self.dir_name
+
+        filenames = [os.path.basename(f) for f in groups[directory_name]]
+        expected_order = [
+            "Story - 1.mp3",
+            "Story - 2.mp3",
+            "Story - 10.mp3"
+        ]
+
+        self.assertEqual(filenames, expected_order)
+
 
 class TestProcessDirectoryEdgeCases(unittest.TestCase):
-    """Test cases for edge cases that cause 'No MP3 groups found' messages."""
+    """
+    Test cases for edge cases that cause 'No MP3 groups found' messages.
+
+    These only exercise the file name matching, so they run against
+    _group_from_names without touching the filesystem.
+    """
+
+    CASES = (
+        (
+            "directory_with_no_mp3_files",
+            (
+                "document.txt",
+                "image.jpg",
+                "video.mp4",
+            ),
+            0,
+        ),
+        (
+            "directory_with_only_unnumbered_mp3_files",
+            (
+                "audio_file.mp3",
+                "another_audio.mp3",
+                "music.mp3",
+            ),
+            0,
+        ),
+        (
+            "directory_with_single_numbered_mp3_file",
+            ("Story - 01.mp3",),
+            0,
+        ),
+        (
+            # Mix of numbered and unnumbered MP3 files but only one numbered
+            "directory_with_mixed_numbered_and_unnumbered_mp3_files",
+            (
+                "Story - 01.mp3",  # Only one numbered file
+                "music.mp3",       # Unnumbered files
+                "audio.mp3",
+                "sound.mp3",
+            ),
+            0,
+        ),
+        (
+            "directory_with_wrong_number_format",
+            (
+                "Story Part 1.mp3",     # Space before number, no dash
+                "Story Part 2.mp3",     # Space before number, no dash
+                "Story (01).mp3",       # Parentheses around number
+                "Story (02).mp3",       # Parentheses around number
+                "Story_01.mp3",         # Underscore instead of dash
+                "Story_02.mp3",         # Underscore instead of dash
+            ),
+            0,
+        ),
+        (
+            # Not at beginning or end
+            "directory_with_numbers_in_middle_of_filename",
+            (
+                "Story 01 Chapter.mp3",
+                "Story 02 Chapter.mp3",
+                "Story 03 Chapter.mp3",
+            ),
+            0,
+        ),
+        (
+            "directory_with_no_dash_separator",
+            (
+                "Story 01.mp3",
+                "Story 02.mp3",
+                "Story 03.mp3",
+            ),
+            0,
+        ),
+        (
+            "directory_with_special_characters_breaking_pattern",
+            (
+                "Story@01.mp3",
+                "Story@02.mp3",
+                "Story#01.mp3",
+                "Story#02.mp3",
+            ),
+            0,
+        ),
+        (
+            # Already has a combined file but no source files
+            "directory_with_existing_combined_file",
+            (
+                "Final Story.mp3",  # Already combined file
+                "readme.txt",
+            ),
+            0,
+        ),
+        (
+            # Should still work as the pattern matching should handle it
+            "directory_with_broken_encoding_filenames",
+            (
+                "Story├╝ - 01.mp3",  # Unicode characters that might cause issues
+                "Story├╝ - 02.mp3",
+            ),
+            2,
+        ),
+        (
+            # 'NN. ' format instead of 'NN - '
+            "directory_with_period_number_format",
+            (
+                "01. Tracey West - Track 1 - Story Title.mp3",
+                "02. Tracey West - Track 2 - Story Title.mp3",
+                "03. Tracey West - Track 3 - Story Title.mp3",
+            ),
+            3,
+        ),
+        (
+            # Complex track naming like real audiobook files
+            "directory_with_complex_track_naming",
+            (
+                "01. Author Name - Track 1 - Book Title - Series Info.mp3",
+                "02. Author Name - Track 2 - Book Title - Series Info.mp3",
+                "03. Author Name - Track 3 - Book Title - Series Info.mp3",
+                "04. Author Name - Track 4 - Book Title - Series Info.mp3",
+                "05. Author Name - Track 5 - Book Title - Series Info.mp3",
+            ),
+            5,
+        ),
+        (
+            "directory_with_mixed_period_and_dash_formats",
+            (
+                "01. Story Title Part One.mp3",  # Period format
+                "02 - Story Title Part Two.mp3",  # Dash format
+                "03. Story Title Part Three.mp3",  # Period format
+            ),
+            3,
+        ),
+        (
+            "directory_with_leading_zeros_period_format",
+            (
+                "001. Story Chapter One.mp3",
+                "002. Story Chapter Two.mp3",
+                "010. Story Chapter Ten.mp3",
+            ),
+            3,
+        ),
+    )
+
+    def test_grouping_cases(self):
+        """Test grouping for each case in CASES."""
+        assert_grouping_cases(self, self.CASES, _group_from_names)
+
+
+class TestProcessDirectory(TempDirTestCase):
+    """Test cases for collecting the jobs of a directory."""
+
+    def setUp(self):
+        """Set up a directory with a group of numbered MP3 files."""
+        super().setUp()
+        self.create_test_files(("Story - 02.mp3", "Story - 01.mp3"))
+        self.output_filename = f"{self.dir_name}.mp3"
+
+    def test_job_for_missing_output(self):
+        """Test that a group without an output file becomes a job."""
+        tasks = process_directory(self.test_dir)
+
+        self.assertEqual(
+            tasks,
+            [
+                (
+                    self.test_dir,
+                    self.dir_name,
+                    [
+                        os.path.join(self.test_dir, "Story - 01.mp3"),
+                        os.path.join(self.test_dir, "Story - 02.mp3"),
+                    ],
+                    os.path.join(self.test_dir, self.output_filename),
+                )
+            ],
+        )
+
+    def test_existing_output_skipped(self):
+        """Test that no job is returned when the output file already exists."""
+        self.create_test_files((self.output_filename,))
+
+        self.assertEqual(process_directory(self.test_dir), [])
+
+    def test_existing_non_mp3_entry_blocks_output(self):
+        """Test that any entry with the output name, even a directory, is kept."""
+        blocking_dir = os.path.join(self.test_dir, self.output_filename)
+        os.mkdir(blocking_dir)
+        self.addCleanup(os.rmdir, blocking_dir)
+
+        self.assertEqual(process_directory(self.test_dir), [])
+
+
+class TestIterMp3Dirs(unittest.TestCase):
+    """Test cases for the iter_mp3_dirs directory walk."""
 
     def setUp(self):
         """Set up a temporary directory for testing."""
-        self.test_dir = tempfile.mkdtemp()
+        self.test_dir = tempfile.mkdtemp(dir=TMPFS_DIR)
 
     def tearDown(self):
         """Clean up temporary directory after tests."""
-        import shutil
         shutil.rmtree(self.test_dir)
 
-    def create_test_files(self, filenames):
-        """Create empty test files in the test directory."""
-        for filename in filenames:
-            file_path = os.path.join(self.test_dir, filename)
-            Path(file_path).touch()
-
-    def test_directory_with_no_mp3_files(self):
-        """Test directory with no MP3 files at all."""
-        test_files = [
-            "document.txt",
-            "image.jpg",
-            "video.mp4"
-        ]
-        self.create_test_files(test_files)
+    def test_hidden_and_system_directories_skipped(self):
+        """Test that hidden and well-known system directories are not walked."""
+        for name in ("Book", ".git", "node_modules", "$RECYCLE.BIN"):
+            directory = os.path.join(self.test_dir, name)
+            os.mkdir(directory)
+            touch(os.path.join(directory, "Story - 01.mp3"))
 
-        groups = find_mp3_groups(self.test_dir)
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
-
-    def test_directory_with_only_unnumbered_mp3_files(self):
-        """Test directory with MP3 files that don't have numbers."""
-        test_files = [
-            "audio_file.mp3",
-            "another_audio.mp3",
-            "music.mp3"
-        ]
-        self.create_test_files(test_files)
+        directories = [d for d, _, _ in iter_mp3_dirs(self.test_dir)]
 
-        groups = find_mp3_groups(self.test_dir)
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
+        self.assertEqual(directories, [os.path.join(self.test_dir, "Book")])
 
-    def test_directory_with_single_numbered_mp3_file(self):
-        """Test directory with only one numbered MP3 file."""
-        test_files = [
-            "Story - 01.mp3"
-        ]
-        self.create_test_files(test_files)
+    def test_stop_ends_walk(self):
+        """Test that setting the stop event ends the walk before the next directory."""
+        for name in ("Book 1", "Book 2", "Book 3"):
+            directory = os.path.join(self.test_dir, name)
+            os.mkdir(directory)
+            touch(os.path.join(directory, "Story - 01.mp3"))
+        stop = threading.Event()
 
-        groups = find_mp3_groups(self.test_dir)
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
+        directories = []
+        for directory, _, _ in iter_mp3_dirs(self.test_dir, stop=stop):
+            directories.append(directory)
+            stop.set()
 
-    def test_directory_with_mixed_numbered_and_unnumbered_mp3_files(self):
-        """
-        Test directory with mix of numbered and unnumbered MP3 files but
-        only one numbered.
-        """
-        test_files = [
-            "Story - 01.mp3",  # Only one numbered file
-            "music.mp3",       # Unnumbered files
-            "audio.mp3",
-            "sound.mp3"
-        ]
-        self.create_test_files(test_files)
+        self.assertEqual(len(directories), 1)
 
-        groups = find_mp3_groups(self.test_dir)
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
-
-    def test_directory_with_wrong_number_format(self):
-        """Test directory with MP3 files that have wrong number formats."""
-        test_files = [
-            "Story Part 1.mp3",     # Space before number, no dash
-            "Story Part 2.mp3",     # Space before number, no dash
-            "Story (01).mp3",       # Parentheses around number
-            "Story (02).mp3",       # Parentheses around number
-            "Story_01.mp3",         # Underscore instead of dash
-            "Story_02.mp3"          # Underscore instead of dash
-        ]
-        self.create_test_files(test_files)
 
-        groups = find_mp3_groups(self.test_dir)
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
+class TestIterMp3DirsCache(unittest.TestCase):
+    """Test cases for skipping unchanged directories with the persistent index."""
 
-    def test_directory_with_numbers_in_middle_of_filename(self):
-        """
-        Test directory with numbers in middle of filename (not at beginning or
-        end).
-        """
-        test_files = [
-            "Story 01 Chapter.mp3",
-            "Story 02 Chapter.mp3",
-            "Story 03 Chapter.mp3"
-        ]
-        self.create_test_files(test_files)
+    def setUp(self):
+        """Set up a temporary directory tree and an in-memory index."""
+        self.test_dir = tempfile.mkdtemp(dir=TMPFS_DIR)
+        self.book_dir = os.path.join(self.test_dir, "Book")
+        self.disc_dir = os.path.join(self.book_dir, "Disc 2")
+        os.makedirs(self.disc_dir)
+        for directory in (self.book_dir, self.disc_dir):
+            for filename in ("Story - 01.mp3", "Story - 02.mp3"):
+                touch(os.path.join(directory, filename))
+        self.cache = open_cache(":memory:")
 
-        groups = find_mp3_groups(self.test_dir)
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
-
-    def test_directory_with_no_dash_separator(self):
-        """Test directory with numbers but no dash separator."""
-        test_files = [
-            "Story 01.mp3",
-            "Story 02.mp3",
-            "Story 03.mp3"
-        ]
-        self.create_test_files(test_files)
+    def tearDown(self):
+        """Clean up temporary directory and index after tests."""
+        self.cache.close()
+        shutil.rmtree(self.test_dir)
 
-        groups = find_mp3_groups(self.test_dir)
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
+    def walk(self):
+        """Walk the tree with the index, marking every yielded directory done."""
+        directories = [d for d, _, _ in iter_mp3_dirs(self.test_dir, self.cache)]
+        for directory in directories:
+            mark_done(self.cache, directory)
+        return directories
+
+    def test_unchanged_directories_skipped(self):
+        """Test that processed, unchanged directories are not yielded again."""
+        self.assertEqual(self.walk(), [self.book_dir, self.disc_dir])
+        self.assertEqual(self.walk(), [])
 
-    def test_directory_with_special_characters_breaking_pattern(self):
+    def test_changed_directory_rescanned(self):
         """
-        Test directory with special characters that break the expected pattern.
+        Test that only a directory whose mtime changed is yielded again, and
+        that subdirectories of a skipped directory are still walked.
         """
-        test_files = [
-            "Story@01.mp3",
-            "Story@02.mp3",
-            "Story#01.mp3",
-            "Story#02.mp3"
-        ]
-        self.create_test_files(test_files)
+        self.walk()
+        mtime_ns = os.stat(self.disc_dir).st_mtime_ns + 1_000_000_000
+        os.utime(self.disc_dir, ns=(mtime_ns, mtime_ns))
 
-        groups = find_mp3_groups(self.test_dir)
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
+        self.assertEqual(self.walk(), [self.disc_dir])
+
+    def test_pending_directory_rescanned(self):
+        """Test that a directory never marked done is yielded again."""
+        list(iter_mp3_dirs(self.test_dir, self.cache))
 
-    def test_directory_with_existing_combined_file(self):
+        directories = [d for d, _, _ in iter_mp3_dirs(self.test_dir, self.cache)]
+        self.assertEqual(directories, [self.book_dir, self.disc_dir])
+
+    def test_target_directory_left_pending(self):
         """
-        Test directory that already has a combined file but no source files.
+        Test that the target directory of a run, whose own MP3 files are ignored,
+        is still processed by a later run on its parent directory.
         """
-        test_files = [
-            "Final Story.mp3",  # Already combined file
-            "readme.txt"
-        ]
-        self.create_test_files(test_files)
+        asyncio.run(process_tree(self.disc_dir, 1, self.cache))
 
-        groups = find_mp3_groups(self.test_dir)
-        self.assertEqual(len(groups), 0)
-        self.assertEqual(groups, {})
+        directories = [d for d, _, _ in iter_mp3_dirs(self.test_dir, self.cache)]
+        self.assertEqual(directories, [self.book_dir, self.disc_dir])
 
-    def test_directory_with_broken_encoding_filenames(self):
+    def test_finished_directory_kept_when_run_fails(self):
         """
-        Test directory with files that have encoding issues in their names.
+        Test that a directory is committed as done once its own jobs finish, even
+        if the run then fails on another directory.
         """
-        test_files = [
-            "Story├╝ - 01.mp3",  # Unicode characters that might cause issues
-            "Story├╝ - 02.mp3"
+        cache_path = os.path.join(self.test_dir, "index.db")
+        cache = open_cache(cache_path)
+
+        async def run_job(semaphore, task):
+            if task[0] == self.disc_dir:
+                await asyncio.sleep(0.05)
+                raise RuntimeError("interrupted")
+            return True
+
+        with mock.patch.object(combine_mp3, "_run_job", run_job):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(process_tree(self.test_dir, 1, cache))
+        # Closing drops anything not committed, as if the process had died
+        cache.close()
+
+        reopened = open_cache(cache_path)
+        self.addCleanup(reopened.close)
+        directories = [d for d, _, _ in iter_mp3_dirs(self.test_dir, reopened)]
+        self.assertEqual(directories, [self.disc_dir])
+
+
+class TestMp3StreamParams(TempDirTestCase):
+    """Test cases for reading MP3 frame headers and comparing file formats."""
+
+    def test_bare_frame_header(self):
+        """Test a file starting directly with a frame header."""
+        path = self.write_file("bare.mp3", STEREO_44K + bytes(100))
+
+        self.assertEqual(_mp3_stream_params(path), ("1", 3, 44100, 2))
+
+    def test_mono_and_sample_rate(self):
+        """Test that the channel mode and sample rate bits are decoded."""
+        mono = self.write_file("mono.mp3", MONO_44K)
+        high_rate = self.write_file("48k.mp3", STEREO_48K)
+
+        self.assertEqual(_mp3_stream_params(mono), ("1", 3, 44100, 1))
+        self.assertEqual(_mp3_stream_params(high_rate), ("1", 3, 48000, 2))
+
+    def test_frame_header_after_id3_tag(self):
+        """Test that an ID3v2 tag with a multi-byte syncsafe size is skipped."""
+        path = self.write_file("tagged.mp3", id3_tag(300) + bytes(300) + MONO_44K)
+
+        self.assertEqual(_mp3_stream_params(path), ("1", 3, 44100, 1))
+
+    def test_frame_header_after_id3_tag_with_footer(self):
+        """Test that the footer of an ID3v2 tag is skipped as well."""
+        path = self.write_file(
+            "footer.mp3",
+            id3_tag(300, footer=True) + bytes(300) + b"3DI" + bytes(7) + MONO_44K,
+        )
+
+        self.assertEqual(_mp3_stream_params(path), ("1", 3, 44100, 1))
+
+    def test_unrecognized_headers(self):
+        """Test that reserved header values and non-MP3 data yield None."""
+        cases = (
+            ("reserved_version", b"\xff\xeb\x90\x64"),
+            ("reserved_layer", b"\xff\xf9\x90\x64"),
+            ("bad_bitrate", b"\xff\xfb\xf0\x64"),
+            ("reserved_sample_rate", b"\xff\xfb\x9c\x64"),
+            ("no_frame_sync", b"RIFF\x00\x00\x00\x00"),
+            ("truncated", STEREO_44K[:3]),
+            ("empty", b""),
+        )
+        for name, data in cases:
+            with self.subTest(case=name):
+                path = self.write_file(f"{name}.mp3", data)
+
+                self.assertIsNone(_mp3_stream_params(path))
+
+    def test_missing_file(self):
+        """Test that a file that can't be read yields None."""
+        path = os.path.join(self.test_dir, "missing.mp3")
+
+        self.assertIsNone(_mp3_stream_params(path))
+
+    def test_format_mismatch_agreeing(self):
+        """Test that files of the same format are not reported."""
+        paths = [
+            self.write_file("Story - 01.mp3", STEREO_44K),
+            self.write_file("Story - 02.mp3", id3_tag(10) + bytes(10) + STEREO_44K),
         ]
-        self.create_test_files(test_files)
 
-        groups = find_mp3_groups(self.test_dir)
-        # This should still work as the pattern matching should handle it
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 2)
+        self.assertIsNone(_format_mismatch(paths))
 
-    def test_directory_with_period_number_format(self):
-        """
-        Test directory with files that start with 'NN. ' format
-        instead of 'NN - '.
-        """
-        test_files = [
-            "01. Tracey West - Track 1 - Story Title.mp3",
-            "02. Tracey West - Track 2 - Story Title.mp3",
-            "03. Tracey West - Track 3 - Story Title.mp3"
+    def test_format_mismatch_unknown(self):
+        """Test that files whose format can't be read are not reported."""
+        paths = [
+            self.write_file("Story - 01.mp3", STEREO_44K),
+            self.write_file("Story - 02.mp3", b"not an mp3"),
+            os.path.join(self.test_dir, "Story - 03.mp3"),
         ]
-        self.create_test_files(test_files)
 
-        groups = find_mp3_groups(self.test_dir)
-        # This should work after fixing the regex to handle 'NN. ' format
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 3)
+        self.assertIsNone(_format_mismatch(paths))
 
-    def test_directory_with_complex_track_naming(self):
-        """
-        Test directory with complex track naming like real audiobook files.
-        """
-        test_files = [
-            "01. Author Name - Track 1 - Book Title - Series Info.mp3",
-            "02. Author Name - Track 2 - Book Title - Series Info.mp3",
-            "03. Author Name - Track 3 - Book Title - Series Info.mp3",
-            "04. Author Name - Track 4 - Book Title - Series Info.mp3",
-            "05. Author Name - Track 5 - Book Title - Series Info.mp3"
+    def test_format_mismatch_channels(self):
+        """Test that mono and stereo files are reported."""
+        paths = [
+            self.write_file("Story - 01.mp3", STEREO_44K),
+            self.write_file("Story - 02.mp3", MONO_44K),
         ]
-        self.create_test_files(test_files)
 
-        groups = find_mp3_groups(self.test_dir)
-        # This should work after fixing the regex to handle 'NN. ' format
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 5)
-
-    def test_directory_with_mixed_period_and_dash_formats(self):
-        """Test directory with mix of 'NN. ' and 'NN - ' formats."""
-        test_files = [
-            "01. Story Title Part One.mp3",  # Period format
-            "02 - Story Title Part Two.mp3",  # Dash format
-            "03. Story Title Part Three.mp3"  # Period format
+        self.assertEqual(
+            _format_mismatch(paths),
+            "MPEG-1 layer 3 44100 Hz 1ch, MPEG-1 layer 3 44100 Hz 2ch",
+        )
+
+    def test_format_mismatch_sample_rate(self):
+        """Test that files with different sample rates are reported."""
+        paths = [
+            self.write_file("Story - 01.mp3", STEREO_48K),
+            self.write_file("Story - 02.mp3", STEREO_44K),
         ]
-        self.create_test_files(test_files)
 
-        groups = find_mp3_groups(self.test_dir)
-        # After fixing, both formats should be recognized
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 3)
-
-    def test_directory_with_leading_zeros_period_format(self):
-        """Test directory with leading zeros in period format."""
-        test_files = [
-            "001. Story Chapter One.mp3",
-            "002. Story Chapter Two.mp3",
-            "010. Story Chapter Ten.mp3"
+        self.assertEqual(
+            _format_mismatch(paths),
+            "MPEG-1 layer 3 44100 Hz 2ch, MPEG-1 layer 3 48000 Hz 2ch",
+        )
+
+
+
+@unittest.skipUnless(os.name == "posix", "the ffmpeg stub is run as a script")
+class TestConcatenateMp3s(TempDirTestCase):
+    """Test cases for running the concat demuxer on an in-memory file list."""
+
+    def setUp(self):
+        """Set up a stub ffmpeg that joins the listed files."""
+        super().setUp()
+        stub = self.write_file("ffmpeg", f"#!{sys.executable}{FFMPEG_STUB}".encode())
+        os.chmod(stub, 0o755)
+        patcher = mock.patch.object(combine_mp3, "_ffmpeg_bin", return_value=stub)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.output_path = os.path.join(self.test_dir, "Story.mp3")
+
+    def write_inputs(self):
+        """Write input files whose names need quoting and encoding in the list."""
+        return [
+            self.write_file("Story's - 01.mp3", STEREO_44K + b"first"),
+            self.write_file("Störy - 02.mp3", STEREO_44K + b"second"),
         ]
-        self.create_test_files(test_files)
 
-        groups = find_mp3_groups(self.test_dir)
-        # This should work after fixing the regex to handle 'NN. ' format
-        self.assertEqual(len(groups), 1)
-        directory_name = os.path.basename(self.test_dir)
-        self.assertIn(directory_name, groups)
-        self.assertEqual(len(groups[directory_name]), 3)
+    def assert_concatenated(self):
+        """Test that the inputs end up joined in order in the output file."""
+        file_list = self.write_inputs()
+
+        self.assertTrue(concatenate_mp3s(file_list, self.output_path))
+
+        with open(self.output_path, "rb") as f:
+            self.assertEqual(f.read(), STEREO_44K + b"first" + STEREO_44K + b"second")
+
+    @unittest.skipUnless(combine_mp3._HAS_DEV_FD, "requires /dev/fd")
+    def test_list_passed_through_dev_fd(self):
+        """Test passing the file list as an inherited pipe opened via /dev/fd."""
+        self.assert_concatenated()
+
+    def test_list_passed_through_stdin(self):
+        """Test the fallback that feeds the file list to ffmpeg's stdin."""
+        with mock.patch.object(combine_mp3, "_HAS_DEV_FD", False):
+            self.assert_concatenated()
+
+    def test_ffmpeg_error_logged(self):
+        """Test that a failing ffmpeg run is reported with its output path."""
+        file_list = [os.path.join(self.test_dir, "Missing - 01.mp3")]
+
+        with self.assertLogs("mp3_combine", "ERROR") as logs:
+            self.assertFalse(concatenate_mp3s(file_list, self.output_path))
+
+        self.assertIn(f"Error running ffmpeg for '{self.output_path}'", logs.output[0])
+        self.assertIn("Error opening input", logs.output[0])
 
 
 if __name__ == "__main__":